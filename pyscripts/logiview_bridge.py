@@ -69,6 +69,8 @@ setproctitle.setproctitle("logiview_bridge")
 # Setting up constants
 TCP_PORT = 102
 SIZE = 128
+LOOP_INTERVAL = 5          # Seconds between temperature updates to the PLC
+EVENT_POLL_INTERVAL = 0.5  # Seconds between PLC event checks while waiting for the next update
 
 # Setting up temperature columns to be sent to PLC
 # T1TOP - Temperature of top of tank 1 and starts on adress 0 and is 2 bytes long
@@ -92,6 +94,17 @@ TEMP_COLUMNS = [
     "T3BOT"
 ]
 
+# The latest row is located with MAX(datetime) instead of ORDER BY ... LIMIT 1.
+# With an index on datetime this is an index probe instead of a sort:
+#     CREATE INDEX idx_tempdata_dt ON logiview.tempdata (datetime DESC);
+LATEST_ROW_SQL = (
+    "FROM logiview.tempdata "
+    "WHERE datetime = (SELECT MAX(datetime) FROM logiview.tempdata) LIMIT 1")
+
+# The temperature SELECT run every loop. It is built once and executed on a
+# prepared cursor, so the server parses and plans it only once per session.
+TEMPERATURES_SQL = f"SELECT datetime, {', '.join(TEMP_COLUMNS)} {LATEST_ROW_SQL}"
+
 # Setting up data columns to get data from PLC and send to MySQL if set to true.
 # VW18  - Not used and starts on adress 18 and is 2 bytes long
 # BP    - Is 1 if boiler pump is on and 0 if boiler pump is off and starts on adress 20 and is 2 bytes long
@@ -108,47 +121,81 @@ STATUS_COLUMNS = [
     ("PT1T2", True)
 ]
 
+# Status columns that are written to MySQL, and the single parameterized UPDATE
+# that writes all of them. It runs on its own prepared cursor so the server
+# parses it only once.
+UPDATE_COLUMNS = [column for column, write_to_db in STATUS_COLUMNS if write_to_db]
+UPDATE_SQL = (
+    f"UPDATE logiview.tempdata SET {', '.join(f'{column} = %s' for column in UPDATE_COLUMNS)} "
+    "ORDER BY datetime DESC LIMIT 1")
+
 
 def get_temperature_value(cnx, cursor, column_name):
     sql_str = (
-        f"SELECT {column_name} FROM logiview.tempdata order by datetime desc limit 1")
+        f"SELECT {column_name} {LATEST_ROW_SQL}")
     try:
         # Execute the SQL statement and fetch the temperature data
         cursor.execute(sql_str)
         # Fetch the all data from database
         sqldata = cursor.fetchall()
-        logging.info(f"Retrieved value for {column_name}: {sqldata[0][0]}")
-        cnx.rollback()  # Need to roll back the transaction eaven is there is no error
+        logging.info("Retrieved value for %s: %s", column_name, sqldata[0][0])
         return int(sqldata[0][0])
     except mysql.connector.Error as err:
-        logging.error(f"Database error: {err}")
-        cnx.rollback()  # Roll back the transaction in case of error
+        logging.error("Database error: %s", err)
         return None
 
+# This function fetches all TEMP_COLUMNS from the latest database entry in one query.
+# Returns (row_datetime, values) with values as ints in TEMP_COLUMNS order,
+# or (None, None) if the row could not be read.
+
+
+def get_all_temperatures(cnx, cursor):
+    try:
+        cursor.execute(TEMPERATURES_SQL)
+        rows = cursor.fetchall()  # Read the whole result so the connection is free again
+        row = rows[0] if rows else None
+        if row is None or None in row:
+            logging.error("Incomplete temperature row: %s", row)
+            return None, None
+        logging.info("Retrieved temperatures: %s", row)
+        return row[0], [int(value) for value in row[1:]]
+    except mysql.connector.Error as err:
+        logging.error("Database error: %s", err)
+        return None, None
+
 # This function sets the value in dataDB1 for the given index
 
 
 def set_data_to_db1(dataDB1, start_index, value):
     dataDB1[start_index] = (value & 0xFF00) >> 8
     dataDB1[start_index + 1] = value & 0x00FF
-    logging.info(f"Set value in dataDB1 at position {start_index}: {value}")
+    logging.info("Set value in dataDB1 at position %d: %d", start_index, value)
 
 # This function retrieves the status value from dataDB1 for the given index
 
 
 def get_status_from_db1(dataDB1, index):
     value = (dataDB1[index] << 8) | dataDB1[index + 1]
-    logging.info(f"Retrieved value from dataDB1 at position {index}: {value}")
+    logging.info("Retrieved value from dataDB1 at position %d: %d", index, value)
     return value
 
-# This function updates the latest database entry with the status value for the provided column_name
+# This function updates the latest database entry with all status values in one statement
+# values must be in UPDATE_COLUMNS order; cursor should be the prepared UPDATE cursor
 
 
-def update_status_in_db(cnx, cursor, column_name, value):
-    sql_str = f"UPDATE logiview.tempdata SET {column_name} = {value} ORDER BY datetime DESC LIMIT 1"
-    cursor.execute(sql_str)
-    cnx.commit()
-    logging.info(f"Updated {column_name} with value {value} in the database")
+def update_status_in_db(cnx, cursor, values):
+    cursor.execute(UPDATE_SQL, tuple(values))  # autocommit: no explicit COMMIT needed
+    logging.info("Updated %s with values %s in the database", UPDATE_COLUMNS, values)
+
+# This function creates the cursors used by the main loop: one prepared cursor for the
+# temperature SELECT and one for the status UPDATE.
+# Prepared statements belong to the MySQL session, so this is redone after a reconnect.
+
+
+def create_cursors(cnx):
+    cursor = cnx.cursor(prepared=True)
+    update_cursor = cnx.cursor(prepared=True)
+    return cursor, update_cursor
 
 # This function loads the Snap7 library. If a path is provided, it will attempt to load the library from that path.
 
@@ -235,7 +282,11 @@ def mainloop():
             user=MYSQL_CONFIG['user'],
             password=MYSQL_CONFIG['password'],
             host=MYSQL_CONFIG['host'],
-            database=MYSQL_CONFIG['database']
+            database=MYSQL_CONFIG['database'],
+            connection_timeout=10,
+            # Every statement is its own transaction: SELECTs always see the newest row
+            # without a ROLLBACK, and UPDATEs need no COMMIT round-trip.
+            autocommit=True
         )
 
         logger.info("Connected to MySQL server successfully")
@@ -244,41 +295,80 @@ def mainloop():
             logger.error("MySQL connection error: Incorrect username or password")
         else:
             logger.error("MySQL connection error: %s", err)
+        server.stop()
+        sys.exit(1)
+
+    # Create the cursors to execute SQL statements.
+    cursor, update_cursor = create_cursors(cnx)
 
-    # Create a cursor to execute SQL statements.
-    cursor = cnx.cursor(buffered=False)
+    # datetime of the row currently loaded into dataDB1
+    last_row_datetime = None
 
     # Main loop
     try:
+        next_tick = time.monotonic()
         while True:
-            for idx, temp in enumerate(TEMP_COLUMNS):
-                value = get_temperature_value(cnx, cursor, temp)
-                set_data_to_db1(dataDB1, idx * 2, value)
-                logging.info(
-                    f"Set value in dataDB1 at position {idx * 2}: {value}")
-
+            next_tick += LOOP_INTERVAL
+
+            # Check that the MySQL connection is still alive and reconnect if it dropped
+            # (e.g. server wait_timeout or a network blip). A new session needs new cursors.
+            # If the server stays unreachable, keep serving the PLC and retry next loop.
+            connection_id = cnx.connection_id
+            try:
+                cnx.ping(reconnect=True, attempts=3, delay=1)
+                db_available = True
+            except mysql.connector.Error as err:
+                logger.error("MySQL server unreachable: %s", err)
+                db_available = False
+            if db_available and cnx.connection_id != connection_id:
+                logger.warning("Reconnected to MySQL server")
+                cursor, update_cursor = create_cursors(cnx)
+
+            # Fetch all temperatures in one query; keep the previous values on failure
+            # and skip re-encoding dataDB1 when the latest row has not changed.
+            row_datetime, values = (
+                get_all_temperatures(cnx, cursor) if db_available else (None, None))
+            if values is not None and row_datetime != last_row_datetime:
+                last_row_datetime = row_datetime
+                for idx, value in enumerate(values):
+                    set_data_to_db1(dataDB1, idx * 2, value)  # logs the value itself
+
+            # Service PLC events until the next tick instead of one blocking sleep
             while True:
                 event = server.pick_event()
                 if event:
-                    logging.info(server.event_text(event))
-                    logging.info("dataDB1 content (hex): " + " ".join([f"{byte:02X}" for byte in dataDB1]))
-                    logging.info("dataPE1 content (hex): " + " ".join([f"{byte:02X}" for byte in dataPE1]))
+                    # The event text and hex dumps are only built if INFO is enabled
+                    if logging.getLogger().isEnabledFor(logging.INFO):
+                        logging.info(server.event_text(event))
+                        logging.info("dataDB1 content (hex): %s", bytes(dataDB1).hex(" ").upper())
+                        logging.info("dataPE1 content (hex): %s", bytes(dataPE1).hex(" ").upper())
 
                     # Read from dataDB1 and update database for status columns
                     # starting index from 9 as VW18 starts at index 9
+                    values = []
                     for idx, (status, write_to_db) in enumerate(STATUS_COLUMNS, start=9):
                         value = get_status_from_db1(dataDB1, idx * 2)
                         if write_to_db:
-                            update_status_in_db(cnx, cursor, status, value)
-                            logging.info(
-                                f"Updated status in database for {status}: {value}")
+                            values.append(value)
+                    try:
+                        update_status_in_db(cnx, update_cursor, values)
+                    except mysql.connector.Error as err:
+                        # The connection is checked and re-established at the next loop
+                        logger.error("Failed to update status in database: %s", err)
 
                     # Update dataPE1 to show that we have read the data from dataDB1
                     dataPE1[0] = 1
                 else:
-                    break
-            time.sleep(5)
+                    remaining = next_tick - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    time.sleep(min(EVENT_POLL_INTERVAL, remaining))
+
+            # Resync instead of bursting if a cycle overran a whole period
+            if time.monotonic() - next_tick > LOOP_INTERVAL:
+                next_tick = time.monotonic()
     finally:
+        update_cursor.close()
         cursor.close()
         cnx.close()
         server.stop()
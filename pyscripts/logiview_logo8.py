@@ -15,26 +15,43 @@ eventlet.monkey_patch()
 
 # 2) STANDARD LIBRARIES
 import argparse
+import atexit
+import contextlib
+import copy
 import io
 import logging
 import logging.handlers
+import queue
+import socket
 import sys
 import time
 import traceback
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from typing import NamedTuple, Optional
 
 # 3) THIRD-PARTY LIBRARIES
 import mysql.connector
 from mysql.connector import pooling
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import snap7
 from snap7.logo import Logo
 import setproctitle
+from urllib3.util.retry import Retry
+
+# Numba is optional: without it the rule functions below run as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # 4) FLASK + SOCKET.IO
 from flask import Flask, render_template
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit
 import threading
 
 # (Optional) Set process title
@@ -54,20 +71,108 @@ RETURNS_TEMP_ON_THRESHOLD = 6000
 RETURNS_TEMP_OFF_THRESHOLD = 5800
 TEMP_DIFF_ON_THRESHOLD = 500   # 5.00°C
 TEMP_DIFF_OFF_THRESHOLD = 300  # 3.00°C
+TANK1_BOTTOM_MIN_TEMP = 5800   # Rule Two: T1BOT must reach 58.00°C to start PT1T2
+T1_OVER_T3_STOP_DIFF = 200     # Boiler OFF: stop PT2T1 once T1BOT - T3TOP >= 2.00°C
 
-# Pump delays & minimum times (in "cycles")
+# Pump delays (in "cycles")
 PUMP_ON_DELAY = 5
 PUMP_OFF_DELAY = 5
+
+# Pump minimum ON/OFF times (seconds of wall-clock time, independent of CYCLE_TIME)
 PUMP_MIN_ON_TIME = 200
 PUMP_MIN_OFF_TIME = 100
 
+# Main loop period (seconds)
+CYCLE_TIME = 1.0
+
+# Longest time (seconds) without a dashboard update while temperatures, statuses
+# and rule/pump states stay the same (the timestamp and pump timers still refresh)
+DASHBOARD_REFRESH_TIME = 10
+
+# Snap7 client timeouts (ms). The library's defaults (3 s send/recv) can stall
+# several 1 s cycles when the PLC drops off the network.
+PLC_PING_TIMEOUT_MS = 500
+PLC_SEND_TIMEOUT_MS = 500
+PLC_RECV_TIMEOUT_MS = 500
+
+# PLC circuit breaker: after this many consecutive failed PLC operations, stop
+# talking to the PLC for PLC_COOLDOWN_TIME seconds (the dashboard keeps updating)
+PLC_MAX_ERRORS = 5
+PLC_COOLDOWN_TIME = 30
+# Pause between disconnect and connect when reconnecting (seconds)
+PLC_RECONNECT_DELAY = 2
+
+# PLC command bit (VM address, bit position) for each transfer pump
+PUMP_VM = {
+    "PT1T2": ("V0.1", 0),  # Tank 1 -> Tank 2
+    "PT2T1": ("V0.0", 0),  # Tank 2 -> Tank 1
+}
+
+# PLC status flags all live in VM byte 1, so they are read with one request
+STATUS_VM_BYTE = "V1"
+STATUS_BIT_BP = 0     # V1.0 Boiler Pump
+STATUS_BIT_PT2T1 = 1  # V1.1
+STATUS_BIT_PT1T2 = 2  # V1.2
+STATUS_BIT_WDT = 3    # V1.3 Watchdog, if used
+
+# Pump status columns written back to the latest tempdata row, in one statement.
+# The row is addressed by the MAX(datetime) read at the start of each tick, so
+# this is an index lookup instead of an ORDER BY datetime DESC sort.
+STATUS_DB_COLUMNS = ("BP", "PT2T1", "PT1T2")
+STATUS_UPDATE_SQL = (
+    "UPDATE logiview.tempdata SET "
+    + ", ".join(f"{col} = %s" for col in STATUS_DB_COLUMNS)
+    + " WHERE datetime = %s"
+)
+
+# The LOGO! VM memory is exposed by snap7 as DB1; "V<n>" is byte n of it
+LOGO_VM_DB = 1
+
+# Set/clear masks for each bit position of a VM byte
+BIT_SET_MASK = tuple(1 << bit for bit in range(8))
+BIT_CLEAR_MASK = tuple(~mask & 0xFF for mask in BIT_SET_MASK)
+
 # MySQL columns for temperature
-TEMP_COLUMNS = [
+TEMP_COLUMNS = (
     "T1TOP", "T1MID", "T1BOT",
     "T2TOP", "T2MID", "T2BOT",
     "T3TOP", "T3MID", "T3BOT",
-    "TRET",  "TBTOP"
-]
+    "TRET",  "TBTOP",
+)
+
+# Key of the newest tempdata row, read once per tick
+LATEST_ROW_DATETIME_SQL = "SELECT MAX(datetime) FROM logiview.tempdata"
+
+# All temperatures of the row with the given datetime in one round trip
+LATEST_TEMPS_SQL = (
+    "SELECT " + ", ".join(TEMP_COLUMNS) +
+    " FROM logiview.tempdata WHERE datetime = %s LIMIT 1"
+)
+
+# MySQLConnectionPool settings (credentials/host come from the command line).
+# main_loop keeps a single connection checked out across cycles; the pool is
+# only there to hand it back reconnected after an error.
+MYSQL_POOL_KWARGS = {
+    "pool_name": "mypool",
+    "pool_size": 1,
+    # No per-session state is set, so skip the COM_RESET_CONNECTION round trip
+    # every time a connection goes back to the pool
+    "pool_reset_session": False,
+    "database": "logiview",
+    "connect_timeout": 10,
+    # Each statement is its own transaction: SELECTs always see the
+    # newest row without a ROLLBACK, and UPDATEs need no COMMIT.
+    "autocommit": True,
+}
+
+# Position of each column in the int32 array from TemperatureReadings.as_array()
+(IDX_T1TOP, IDX_T1MID, IDX_T1BOT,
+ IDX_T2TOP, IDX_T2MID, IDX_T2BOT,
+ IDX_T3TOP, IDX_T3MID, IDX_T3BOT,
+ IDX_TRET,  IDX_TBTOP) = range(len(TEMP_COLUMNS))
+
+# Value stored in the array for a missing (NULL) reading
+TEMP_MISSING = -32768
 
 # Specific heat capacity (Wh / (L·°C))
 SPECIFIC_HEAT_CAPACITY = 1.16
@@ -82,16 +187,65 @@ SPECIFIC_HEAT_CAPACITY = 1.16
 ENERGY_DIFF_START = 500.0  # e.g., 500 Wh difference needed to start
 ENERGY_DIFF_STOP = 300.0   # e.g., 300 Wh difference to keep running
 
+# Static description of the 3 rules shown on the dashboard:
+#   1) Rule One (Emergency Overheat)
+#   2) Rule Two (Normal Operation)
+#   3) "Boiler OFF" scenario (T2->T1 with scaled energy + hysteresis).
+# Sent once per client on connect; only Algorithm.rule_state changes per cycle.
+RULE_META = (
+    {
+        "name": "Rule One (Emergency Overheat Protection)",
+        "description": (
+            "If TBTOP > 87°C, or T1BOT > 80°C, or TRET > 60°C => PT1T2 ON."
+        ),
+    },
+    {
+        "name": "Rule Two (Normal Operation)",
+        "description": (
+            "If TRET > 60°C or (T1BOT >= 58°C and T1MID > T2TOP+5°C) => PT1T2 ON. "
+            "Stop if (T1BOT - T3BOT) <= 3°C after min ON time."
+        ),
+    },
+    {
+        "name": "Boiler OFF Algorithm",
+        "description": (
+            "If Boiler is OFF, ensure Tank 1 accumulates more energy by transferring "
+            "from T2->T1 (scaled energy approach) with hysteresis."
+        ),
+    },
+)
+
 
 # --- FLASK & SOCKETIO SETUP ---
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'some_secret_key'
-socketio = SocketIO(app, async_mode='eventlet', logger=True, engineio_logger=True)
+# Packets are msgpack-encoded (needs the msgpack package); the dashboard loads
+# the socket.io client bundle that includes the matching msgpack parser.
+# Served by eventlet's WSGI server (eventlet is monkey-patched above); the
+# per-packet Socket.IO/Engine.IO logs are off so emits cost no log I/O.
+socketio = SocketIO(
+    app, async_mode='eventlet', serializer='msgpack', logger=False, engineio_logger=False
+)
 
 
 # --- HELPER CLASSES/FUNCTIONS ---
 
+def _diff(new, old):
+    """
+    Return the top-level keys of 'new' whose values differ from 'old'.
+    """
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def _to_c(value):
+    """
+    Convert a reading in hundredths of °C to °C for display (None stays None).
+    The control logic itself only compares the raw integers.
+    """
+    return value / 100.0 if value is not None else None
+
+
 def exit_program(logger, pushbullet=None, exit_code=1, message="Exiting"):
     """
     Safely exit the program with optional push notification and logging.
@@ -101,7 +255,7 @@ def exit_program(logger, pushbullet=None, exit_code=1, message="Exiting"):
     else:
         logger.error(message)
     if pushbullet and USE_PUSHBULLET:
-        pushbullet.push_note("LogiView LOGO8 Exit", message)
+        pushbullet.push_note("LogiView LOGO8 Exit", message, wait=True)
     sys.exit(exit_code)
 
 
@@ -113,24 +267,43 @@ class Pushbullet:
         self.logger = logger
         self.api_key = api_key
 
-    def push_note(self, title, body):
+        # Keep-alive session: later notes reuse the TCP+TLS connection.
+        # Only connection errors are retried (POST is not idempotent).
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Access-Token": self.api_key,
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=2,
+            max_retries=Retry(total=2, backoff_factor=0.5)
+        )
+        self.session.mount("https://", adapter)
+
+    def push_note(self, title, body, wait=False):
+        """
+        Send a note. By default the POST runs in its own green thread so the
+        control loop never waits on the network; wait=True sends it inline
+        (used on exit, where the process would end before a background send).
+        """
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         titlemsg = f"{title} [{timestamp}]"
+        if wait:
+            self._send_note(titlemsg, body)
+        else:
+            eventlet.spawn_n(self._send_note, titlemsg, body)
 
+    def _send_note(self, titlemsg, body):
         url = "https://api.pushbullet.com/v2/pushes"
-        headers = {
-            "Access-Token": self.api_key,
-            "Content-Type": "application/json"
-        }
         data = {
             "type": "note",
             "title": titlemsg,
             "body": body
         }
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             if response.status_code == 200:
-                self.logger.debug(f"Pushbullet sent: {titlemsg} / {body}")
+                self.logger.debug("Pushbullet sent: %s / %s", titlemsg, body)
             else:
                 self.logger.error(
                     f"Pushbullet error (status {response.status_code}): {titlemsg}"
@@ -141,7 +314,7 @@ class Pushbullet:
 
 class LoggerClass:
     """
-    Central logger setup (syslog + console). Captures stderr for better error messages.
+    Central logger setup (syslog + console).
     """
     def __init__(self, logging_level=logging.INFO):
         self.logger = self.setup_logging(logging_level)
@@ -150,6 +323,7 @@ class LoggerClass:
         self.warning = self.logger.warning
         self.error = self.logger.error
         self.critical = self.logger.critical
+        self.isEnabledFor = self.logger.isEnabledFor
 
     def setup_logging(self, logging_level):
         try:
@@ -158,23 +332,34 @@ class LoggerClass:
             logger.propagate = False  # Avoid duplicated logs
 
             # Syslog handler
-            syslog_handler = logging.handlers.SysLogHandler(address='/dev/log')
+            syslog_handler = logging.handlers.SysLogHandler(
+                address='/dev/log', socktype=socket.SOCK_DGRAM
+            )
             syslog_format = logging.Formatter(
                 "%(name)s[%(process)d]: %(levelname)s - %(message)s"
             )
             syslog_handler.setFormatter(syslog_format)
-            logger.addHandler(syslog_handler)
+            # Buffer syslog records and send them in batches; WARNING and above
+            # flush the buffer immediately.
+            syslog_buffer = logging.handlers.MemoryHandler(
+                capacity=128, flushLevel=logging.WARNING, target=syslog_handler
+            )
 
             # Console handler
             console_handler = logging.StreamHandler()
             console_format = logging.Formatter("%(levelname)s - %(message)s")
             console_handler.setFormatter(console_format)
-            logger.addHandler(console_handler)
 
-            # Capture stderr
-            captured_output = io.StringIO()
-            self.original_stderr = sys.stderr
-            sys.stderr = captured_output
+            # The control loop only enqueues records; syslog/console I/O happens
+            # on the listener thread. Stopped (and drained) at exit, before
+            # logging.shutdown() flushes the syslog buffer.
+            log_queue = queue.Queue(-1)
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            self.listener = logging.handlers.QueueListener(
+                log_queue, syslog_buffer, console_handler
+            )
+            self.listener.start()
+            atexit.register(self.listener.stop)
 
             logger.debug("Logger initialized.")
             return logger
@@ -184,58 +369,230 @@ class LoggerClass:
             return None
 
 
-@dataclass
 class TemperatureReadings:
     """
-    Holds temperature data from the DB.
+    Holds temperature data from the DB (one slot per TEMP_COLUMNS entry),
+    plus the same readings packed as an int32 array in `raw`.
     """
-    T1TOP: int = None
-    T1MID: int = None
-    T1BOT: int = None
-    T2TOP: int = None
-    T2MID: int = None
-    T2BOT: int = None
-    T3TOP: int = None
-    T3MID: int = None
-    T3BOT: int = None
-    TRET: int = None
-    TBTOP: int = None
+    __slots__ = TEMP_COLUMNS + ("raw",)
+
+    def __init__(self, **readings):
+        self.set_all([readings.get(col) for col in TEMP_COLUMNS])
+
+    def set_all(self, values):
+        """
+        Assign all readings at once from a sequence ordered as TEMP_COLUMNS.
+        Readings should only be changed through here, so `raw` stays in sync.
+        """
+        (self.T1TOP, self.T1MID, self.T1BOT,
+         self.T2TOP, self.T2MID, self.T2BOT,
+         self.T3TOP, self.T3MID, self.T3BOT,
+         self.TRET, self.TBTOP) = values
+        # Pack once per new row instead of on every as_array() call
+        self.raw = np.array(
+            [TEMP_MISSING if val is None else val for val in values], dtype=np.int32
+        )
+
+    def as_dict(self, into=None):
+        """
+        Readings keyed by column name. If `into` is given it is filled in
+        place (and returned) instead of allocating a new dict.
+        """
+        values = {} if into is None else into
+        for col in TEMP_COLUMNS:
+            values[col] = getattr(self, col)
+        return values
+
+    def as_array(self):
+        """
+        The readings as an int32 array ordered as TEMP_COLUMNS, with missing
+        readings stored as TEMP_MISSING. The array is shared; don't modify it.
+        """
+        return self.raw
 
 
-@dataclass
-class PumpStatus:
+class PumpStatus(NamedTuple):
     """
-    Holds boolean status for each pump read from the PLC.
+    Holds boolean status for each pump read from the PLC (None = not read yet).
+    Immutable: each PLC read produces a new instance, which also makes it
+    directly comparable/hashable.
     """
-    BP: bool = None   # Boiler Pump
-    PT2T1: bool = None
-    PT1T2: bool = None
-    WDT: bool = None  # Watchdog, if used
+    BP: Optional[bool] = None   # Boiler Pump
+    PT2T1: Optional[bool] = None
+    PT1T2: Optional[bool] = None
+    WDT: Optional[bool] = None  # Watchdog, if used
 
+    def as_dict(self, into=None):
+        """
+        Statuses keyed by name; fills `into` in place if given.
+        """
+        values = {} if into is None else into
+        values.update(zip(self._fields, self))
+        return values
+
+
+def read_all_pump_status(plc_handler):
+    """
+    Read the shared status VM byte once and decode every pump bit from it.
+    """
+    status_byte = plc_handler.read_byte(STATUS_VM_BYTE)
+    return PumpStatus(
+        BP=bool(status_byte & BIT_SET_MASK[STATUS_BIT_BP]),
+        PT2T1=bool(status_byte & BIT_SET_MASK[STATUS_BIT_PT2T1]),
+        PT1T2=bool(status_byte & BIT_SET_MASK[STATUS_BIT_PT1T2]),
+        # WDT=bool(status_byte & BIT_SET_MASK[STATUS_BIT_WDT]),  # If used
+    )
+
+
+class PumpCounters:
+    """
+    Commanded ON/OFF state of one transfer pump, plus the whole seconds it
+    has been running (runtime) or stopped (offtime). Both are measured from
+    the last switch() on time.monotonic(), so they don't depend on how often
+    the control loop runs or whether cycles were skipped.
+    """
+    __slots__ = ("is_on", "since")
+
+    def __init__(self):
+        self.is_on = False
+        self.since = time.monotonic()
+
+    def switch(self, state):
+        """
+        Record a new commanded state and restart the matching timer.
+        """
+        self.is_on = state
+        self.since = time.monotonic()
 
-def get_temperature_value(cnx_pool, column_name, logger):
+    @property
+    def runtime(self):
+        return int(time.monotonic() - self.since) if self.is_on else 0
+
+    @property
+    def offtime(self):
+        return 0 if self.is_on else int(time.monotonic() - self.since)
+
+
+def get_all_temperatures(cursor, row_datetime, logger):
     """
-    Fetch latest reading from the DB for the given column.
+    Fetch every TEMP_COLUMNS column of the row at row_datetime in one query,
+    on the prepared cursor kept open by MainClass.
+    Returns a list ordered as TEMP_COLUMNS (None for NULL columns),
+    or None if no row could be read.
     """
-    sql = f"SELECT {column_name} FROM logiview.tempdata ORDER BY datetime DESC LIMIT 1"
     try:
-        with cnx_pool.get_connection() as cnx:
-            with cnx.cursor() as cursor:
-                cursor.execute(sql)
-                result = cursor.fetchone()
-                if result and result[0] is not None:
-                    val = int(result[0])
-                    logger.debug(f"Got {column_name}={val}")
-                    cnx.rollback()
-                    return val
-                else:
-                    logger.error(f"No data or NULL for {column_name}")
-                    return None
+        cursor.execute(LATEST_TEMPS_SQL, (row_datetime,))
+        # fetchall() so the (at most one row) result is fully read before the
+        # cursor's next execute
+        rows = cursor.fetchall()
+        if not rows:
+            logger.error("No data in logiview.tempdata")
+            return None
+        values = [None if val is None else int(val) for val in rows[0]]
+        for column_name, val in zip(TEMP_COLUMNS, values):
+            if val is None:
+                logger.error(f"No data or NULL for {column_name}")
+        logger.debug("Got %s", values)
+        return values
     except mysql.connector.Error as err:
-        logger.error(f"DB error reading {column_name}: {err}")
+        logger.error(f"DB error reading temperatures: {err}")
         return None
 
 
+@njit(cache=True)
+def evaluate_boiler_on_rules(temps):
+    """
+    Pure Rule One / Rule Two conditions on the int32 array from
+    TemperatureReadings.as_array(). Returns the tuple
+    (emergency, cleared, pump_start, pump_stop); pump I/O stays in Algorithm.
+    """
+    t1mid = temps[IDX_T1MID]
+    t1bot = temps[IDX_T1BOT]
+    t2top = temps[IDX_T2TOP]
+    t3bot = temps[IDX_T3BOT]
+    tret = temps[IDX_TRET]
+    tbtop = temps[IDX_TBTOP]
+
+    # Every comparison is evaluated and combined with | and & instead of
+    # short-circuit and/or, so the conditions compile without branches.
+    # The int32 differences stay in range even when an input is TEMP_MISSING.
+
+    # Rule One: TEMP_MISSING is far below every limit, so it never triggers
+    tret_high = tret > RETURNS_TEMP_ON_THRESHOLD
+    emergency = (
+        (tbtop > BOILER_OVERHEAT_THRESHOLD) |
+        (t1bot > CRITICAL_TANK_TEMP) |
+        tret_high
+    )
+    cleared = (
+        (tret != TEMP_MISSING) & (tret <= RETURNS_TEMP_OFF_THRESHOLD) &
+        (tbtop != TEMP_MISSING) & (tbtop < BOILER_SAFE_THRESHOLD)
+    )
+
+    # Rule Two
+    pump_start = tret_high | (
+        (t1bot != TEMP_MISSING) & (t1mid != TEMP_MISSING) & (t2top != TEMP_MISSING) &
+        (t1bot >= TANK1_BOTTOM_MIN_TEMP) & ((t1mid - t2top) > TEMP_DIFF_ON_THRESHOLD)
+    )
+    pump_stop = (
+        (t1bot != TEMP_MISSING) & (t3bot != TEMP_MISSING) &
+        ((t1bot - t3bot) <= TEMP_DIFF_OFF_THRESHOLD)
+    )
+
+    return emergency, cleared, pump_start, pump_stop
+
+
+@njit(cache=True)
+def evaluate_tank_energies(temps, k_tank1, k_tank2, vol_ratio):
+    """
+    Boiler OFF energy math on the int32 array from TemperatureReadings.as_array().
+    k_tank1/k_tank2 are volume * SPECIFIC_HEAT_CAPACITY (Wh/°C) of T1/T2 and
+    vol_ratio is volume T1 / volume T2.
+    Returns (avg_temp_t1, avg_temp_t2, energy_tank1, energy_tank2, scaled_energy_t2, diff);
+    the caller must make sure no T1/T2 reading is TEMP_MISSING.
+    """
+    # 1) Average temps for T1, T2 (°C)
+    avg_temp_t1 = (temps[IDX_T1TOP] + temps[IDX_T1MID] + temps[IDX_T1BOT]) / 300.0
+    avg_temp_t2 = (temps[IDX_T2TOP] + temps[IDX_T2MID] + temps[IDX_T2BOT]) / 300.0
+
+    # 2) Total energies in Wh
+    energy_tank1 = k_tank1 * avg_temp_t1
+    energy_tank2 = k_tank2 * avg_temp_t2
+
+    # 3) Scale T2's energy to T1's volume
+    # so if T2 and T1 have same avg temp => diff is 0
+    scaled_energy_t2 = energy_tank2 * vol_ratio
+    diff = scaled_energy_t2 - energy_tank1
+
+    return avg_temp_t1, avg_temp_t2, energy_tank1, energy_tank2, scaled_energy_t2, diff
+
+
+def warm_up_rule_functions():
+    """
+    Call each njit rule function once with dummy readings, so compilation
+    (or loading the on-disk cache) happens before the first control cycle.
+    """
+    temps = np.full(len(TEMP_COLUMNS), 5000, dtype=np.int32)
+    evaluate_boiler_on_rules(temps)
+    # float constants, same argument types as Algorithm passes
+    evaluate_tank_energies(temps, 1.0, 1.0, 1.0)
+
+
+def vm_byte_offset(vm_address):
+    """
+    Byte offset in the VM for a byte address such as "V1".
+    """
+    if not (vm_address[:1] == "V" and vm_address[1:].isdigit()):
+        raise ValueError(f"Not a VM byte address: {vm_address}")
+    return int(vm_address[1:])
+
+
+class PlcUnavailableError(Exception):
+    """
+    Raised by LogoPlcHandler while PLC access is paused after repeated errors.
+    """
+
+
 class LogoPlcHandler:
     """
     Manages read/write to the Siemens Logo! PLC via snap7.
@@ -244,45 +601,125 @@ class LogoPlcHandler:
         self.logger = logger
         self.plc_address = plc_address
         self.plc = Logo()
+        # Software copy of each VM address written by this process. We are the only
+        # writer of these, so write_bit can modify the copy instead of reading the PLC.
+        self._shadow = {}
+        # Parsed byte offset of each "V<n>" address passed to read_byte
+        self._vm_offsets = {}
+        # Circuit breaker state, see _check_available / _record_error
+        self._plc_err_count = 0
+        self._plc_cooldown_until = 0.0
         self.connect()
 
     def connect(self):
         try:
+            # Snap7 already sets TCP_NODELAY/SO_KEEPALIVE on its socket natively;
+            # what we can tune from here are the timeouts.
+            self.plc.set_param(snap7.types.PingTimeout, PLC_PING_TIMEOUT_MS)
+            self.plc.set_param(snap7.types.SendTimeout, PLC_SEND_TIMEOUT_MS)
+            self.plc.set_param(snap7.types.RecvTimeout, PLC_RECV_TIMEOUT_MS)
             self.plc.connect(self.plc_address, 0, 2)
-            self.logger.info(f"Connected to PLC at {self.plc_address}")
+            self.logger.info("Connected to PLC at %s", self.plc_address)
         except Exception as e:
             self.logger.error(f"PLC connect error: {e}")
             raise
+        self.prime_shadow()
+
+    def prime_shadow(self):
+        """
+        Drop the shadow copies and pre-read the pump command addresses, so
+        write_bit needs no read round trip after a (re)connect.
+        """
+        self._shadow.clear()
+        for vm_address, _ in PUMP_VM.values():
+            try:
+                self._shadow[vm_address] = self.plc.read(vm_address)
+            except Exception as e:
+                # write_bit falls back to reading the address on first use
+                self.logger.warning(f"PLC shadow pre-read failed at {vm_address}: {e}")
+
+    def _check_available(self):
+        """
+        Raise PlcUnavailableError during a cooldown. Once the cooldown is
+        over, make one reconnect attempt before the PLC is used again.
+        """
+        if self._plc_err_count >= PLC_MAX_ERRORS:
+            if time.monotonic() < self._plc_cooldown_until:
+                raise PlcUnavailableError("PLC access paused after repeated errors")
+            self.reconnect()
+
+    def _record_error(self):
+        """
+        Count a failed PLC operation: reconnect, or start a cooldown once
+        PLC_MAX_ERRORS errors happened in a row.
+        """
+        self._plc_err_count += 1
+        if self._plc_err_count >= PLC_MAX_ERRORS:
+            self._plc_cooldown_until = time.monotonic() + PLC_COOLDOWN_TIME
+            self.logger.warning(
+                "%d consecutive PLC errors, pausing PLC access for %d s",
+                self._plc_err_count, PLC_COOLDOWN_TIME
+            )
+        else:
+            self.reconnect()
 
     def read_bit(self, vm_address, bit_position):
+        self._check_available()
         try:
-            data = self.plc.read(vm_address)
-            byte_data = bytearray([data])
-            return bool((byte_data[0] >> bit_position) & 1)
+            value = bool(self.plc.read(vm_address) & BIT_SET_MASK[bit_position])
         except Exception as e:
             self.logger.error(f"PLC read_bit error at {vm_address}.{bit_position}: {e}")
-            self.reconnect()
+            self._record_error()
             raise
+        self._plc_err_count = 0
+        return value
+
+    def read_byte(self, vm_address):
+        """
+        Read a whole VM byte (e.g. "V1") in a single PLC request.
+        The address is parsed once; later reads go straight to db_read.
+        """
+        self._check_available()
+        try:
+            offset = self._vm_offsets.get(vm_address)
+            if offset is None:
+                offset = self._vm_offsets[vm_address] = vm_byte_offset(vm_address)
+            value = self.plc.db_read(LOGO_VM_DB, offset, 1)[0]
+        except Exception as e:
+            self.logger.error(f"PLC read_byte error at {vm_address}: {e}")
+            self._record_error()
+            raise
+        self._plc_err_count = 0
+        return value
 
     def write_bit(self, vm_address, bit_position, value):
+        self._check_available()
         try:
-            data = self.plc.read(vm_address)
-            byte_data = bytearray([data])
-            if value:
-                byte_data[0] |= (1 << bit_position)
-            else:
-                byte_data[0] &= ~(1 << bit_position)
-            self.plc.write(vm_address, byte_data[0])
+            data = self._shadow.get(vm_address)
+            if data is None:
+                # Not primed (pre-read failed or unknown address): fetch it once
+                data = self.plc.read(vm_address)
+                self._shadow[vm_address] = data
+            # Clear the bit, then OR in the new value (no branch on value)
+            new_data = (data & BIT_CLEAR_MASK[bit_position]) | (bool(value) << bit_position)
+            # Only talk to the PLC if the value actually changes
+            if new_data != data:
+                self.plc.write(vm_address, new_data)
+                self._shadow[vm_address] = new_data
         except Exception as e:
             self.logger.error(f"PLC write_bit error at {vm_address}.{bit_position}: {e}")
-            self.reconnect()
+            self._record_error()
             raise
+        self._plc_err_count = 0
 
     def reconnect(self):
         try:
             self.logger.info("Attempting PLC reconnect...")
+            # The PLC may have restarted; don't trust the shadow copies
+            self._shadow.clear()
             self.disconnect()
-            time.sleep(2)
+            # Yield to the Flask/Socket.IO green threads while we wait
+            eventlet.sleep(PLC_RECONNECT_DELAY)
             self.connect()
         except Exception as e:
             self.logger.error(f"PLC reconnection failed: {e}")
@@ -305,49 +742,25 @@ class Algorithm:
         self.logger = logger
 
         # Pump states + counters
-        self.pump_state_PT1T2 = False
-        self.pump_runtime_PT1T2 = 0
-        self.pump_offtime_PT1T2 = 0
-
-        self.pump_state_PT2T1 = False
-        self.pump_runtime_PT2T1 = 0
-        self.pump_offtime_PT2T1 = 0
-
-        # We'll define 3 "rules" for demonstration:
-        #   1) Rule One (Emergency Overheat)
-        #   2) Rule Two (Normal Operation)
-        #   3) "Boiler OFF" scenario (T2->T1 with scaled energy + hysteresis).
-        self.rules = [
-            {
-                "name": "Rule One (Emergency Overheat Protection)",
-                "description": (
-                    "If TBTOP > 87°C, or T1BOT > 80°C, or TRET > 60°C => PT1T2 ON."
-                ),
-                "is_active": False,
-                "actual_values": {}
-            },
-            {
-                "name": "Rule Two (Normal Operation)",
-                "description": (
-                    "If TRET > 60°C or (T1BOT >= 58°C and T1MID > T2TOP+5°C) => PT1T2 ON. "
-                    "Stop if (T1BOT - T3BOT) <= 3°C after min ON time."
-                ),
-                "is_active": False,
-                "actual_values": {}
-            },
-            {
-                "name": "Boiler OFF Algorithm",
-                "description": (
-                    "If Boiler is OFF, ensure Tank 1 accumulates more energy by transferring "
-                    "from T2->T1 (scaled energy approach) with hysteresis."
-                ),
-                "is_active": False,
-                "actual_values": {}
-            }
-        ]
+        self.pumps = {pump_name: PumpCounters() for pump_name in PUMP_VM}
+        self.pt1t2 = self.pumps["PT1T2"]
+        self.pt2t1 = self.pumps["PT2T1"]
+
+        # Dynamic part of each rule in RULE_META (same order)
+        self.rule_state = [{"is_active": False, "actual_values": {}} for _ in RULE_META]
+        # The "Boiler OFF" observed values dict is only ever updated in place
+        self.boiler_off_observed = self.rule_state[2]["actual_values"]
 
         # Master dictionary used for real-time updates
-        self.state = {}
+        # The nested temperature/status dicts are reused and refreshed in place
+        self.state = {'temperatures': {}, 'statuses': {}}
+        # Snapshot of what the dashboards have been sent so far. It holds copies,
+        # since self.state and self.rule_state are mutated in place every cycle.
+        self._last_state = {}
+        # What the last emit was based on, see execute_algorithm
+        self._last_emit_fingerprint = None
+        self._last_emit_time = 0.0
+        socketio.on_event('connect', self.on_connect)
         # Boolean flags for each rule
         self.rule_one_active = False
         self.rule_two_active = False
@@ -364,55 +777,53 @@ class Algorithm:
             'Tank2': 750,
             'Tank3': 750
         }
+        # Per-tank constants for evaluate_tank_energies; the volumes never change
+        self._k_tank1 = self.tank_volumes['Tank1'] * SPECIFIC_HEAT_CAPACITY
+        self._k_tank2 = self.tank_volumes['Tank2'] * SPECIFIC_HEAT_CAPACITY
+        self._vol_ratio = self.tank_volumes['Tank1'] / self.tank_volumes['Tank2']
+        # Row datetime the T1/T2 energy diff below was computed for; the
+        # energies only change when a new DB row arrives.
+        self._last_temp_dt = None
+        self._tank_energy_diff = None
 
     def set_transfer_pump(self, pump_name, state):
         """
         Turn pump ON/OFF by writing bit to PLC memory.
         """
         try:
-            if pump_name == "PT1T2":
-                vm_address = "V0.1"
-                bit_position = 0
-                self.plc_handler.write_bit(vm_address, bit_position, state)
-                self.pump_state_PT1T2 = state
-                if state:
-                    self.pump_runtime_PT1T2 = 0
-                else:
-                    self.pump_offtime_PT1T2 = 0
-
-            elif pump_name == "PT2T1":
-                vm_address = "V0.0"
-                bit_position = 0
-                self.plc_handler.write_bit(vm_address, bit_position, state)
-                self.pump_state_PT2T1 = state
-                if state:
-                    self.pump_runtime_PT2T1 = 0
-                else:
-                    self.pump_offtime_PT2T1 = 0
+            vm_address, bit_position = PUMP_VM[pump_name]
+            self.plc_handler.write_bit(vm_address, bit_position, state)
+            self.pumps[pump_name].switch(state)
 
-            self.logger.debug(f"Set pump {pump_name} to {'ON' if state else 'OFF'}")
+            self.logger.debug("Set pump %s to %s", pump_name, "ON" if state else "OFF")
         except Exception as e:
-            self.logger.error(f"Failed to set pump {pump_name} to {state}: {e}")
+            self.logger.error("Failed to set pump %s to %s: %s", pump_name, state, e)
 
-    def execute_algorithm(self, temp: TemperatureReadings, status: PumpStatus):
+    def execute_algorithm(self, temp: TemperatureReadings, status: PumpStatus, temp_dt=None):
         """
         Main entry for our logic. Called every loop with updated temps + status.
+        temp_dt is the datetime of the DB row in temp (None if unknown).
         """
         self.logger.debug(">>> Executing Algorithm.")
+        # Until the PLC status has been read once, BP is None and "boiler OFF"
+        # would be assumed; don't drive the pumps on a guess.
+        if status.BP is None:
+            self.logger.warning("No pump status read from PLC yet, skipping algorithm.")
+            return
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Build state dictionary
         self.state['timestamp'] = now
-        self.state['temperatures'] = temp.__dict__
-        self.state['statuses'] = status.__dict__
+        temp.as_dict(into=self.state['temperatures'])
+        status.as_dict(into=self.state['statuses'])
 
-        self.state['pump_state_PT1T2'] = self.pump_state_PT1T2
-        self.state['pump_runtime_PT1T2'] = self.pump_runtime_PT1T2
-        self.state['pump_offtime_PT1T2'] = self.pump_offtime_PT1T2
+        self.state['pump_state_PT1T2'] = self.pt1t2.is_on
+        self.state['pump_runtime_PT1T2'] = self.pt1t2.runtime
+        self.state['pump_offtime_PT1T2'] = self.pt1t2.offtime
 
-        self.state['pump_state_PT2T1'] = self.pump_state_PT2T1
-        self.state['pump_runtime_PT2T1'] = self.pump_runtime_PT2T1
-        self.state['pump_offtime_PT2T1'] = self.pump_offtime_PT2T1
+        self.state['pump_state_PT2T1'] = self.pt2t1.is_on
+        self.state['pump_runtime_PT2T1'] = self.pt2t1.runtime
+        self.state['pump_offtime_PT2T1'] = self.pt2t1.offtime
 
         # Decide on boiler ON vs. boiler OFF
         if status.BP:
@@ -421,53 +832,75 @@ class Algorithm:
             self.boiler_off_active = False
         else:
             # Boiler is OFF => apply boiler_off_algorithm
-            self.boiler_off_algorithm(temp, status)
+            self.boiler_off_algorithm(temp, status, temp_dt)
             self.boiler_off_active = True
 
         # Mark the rule dictionaries "is_active" flags
-        self.rules[0]["is_active"] = self.rule_one_active      # Rule One
-        self.rules[1]["is_active"] = self.rule_two_active      # Rule Two
-        self.rules[2]["is_active"] = self.boiler_off_active    # Boiler Off
+        self.rule_state[0]["is_active"] = self.rule_one_active      # Rule One
+        self.rule_state[1]["is_active"] = self.rule_two_active      # Rule Two
+        self.rule_state[2]["is_active"] = self.boiler_off_active    # Boiler Off
 
         # For demonstration, store real-time "observed values" for each rule
-        self.rules[0]["actual_values"] = {
-            "TBTOP": (temp.TBTOP / 100.0 if temp.TBTOP else None),
-            "T1BOT": (temp.T1BOT / 100.0 if temp.T1BOT else None),
-            "TRET":  (temp.TRET  / 100.0 if temp.TRET  else None),
+        tbtop, t1bot, tret = temp.TBTOP, temp.T1BOT, temp.TRET
+        t3bot, t2top = temp.T3BOT, temp.T2TOP
+        self.rule_state[0]["actual_values"] = {
+            "TBTOP": _to_c(tbtop),
+            "T1BOT": _to_c(t1bot),
+            "TRET":  _to_c(tret),
         }
-        self.rules[1]["actual_values"] = {
-            "TRET":  (temp.TRET  / 100.0 if temp.TRET  else None),
-            "T1BOT": (temp.T1BOT / 100.0 if temp.T1BOT else None),
-            "T3BOT": (temp.T3BOT / 100.0 if temp.T3BOT else None),
-            "T2TOP": (temp.T2TOP / 100.0 if temp.T2TOP else None),
+        self.rule_state[1]["actual_values"] = {
+            "TRET":  _to_c(tret),
+            "T1BOT": _to_c(t1bot),
+            "T3BOT": _to_c(t3bot),
+            "T2TOP": _to_c(t2top),
         }
         # We'll fill the "Boiler OFF" actual_values inside boiler_off_algorithm.
 
-        # Put the rules into the state so the frontend can display them
-        self.state['rules'] = self.rules
+        # Put the rule states into the state so the frontend can display them
+        self.state['rules'] = self.rule_state
 
-        # Emit updates to the dashboard
-        socketio.emit('update', self.state)
+        # Nothing the dashboard shows changed (apart from the clock/timers):
+        # skip the diff and the emit until DASHBOARD_REFRESH_TIME has passed
+        fingerprint = (
+            temp.raw.tobytes(), status,
+            self.rule_one_active, self.rule_two_active, self.boiler_off_active,
+            self.pt1t2.is_on, self.pt2t1.is_on,
+        )
+        emit_time = time.monotonic()
+        if (fingerprint == self._last_emit_fingerprint
+                and emit_time - self._last_emit_time < DASHBOARD_REFRESH_TIME):
+            return
+        self._last_emit_fingerprint = fingerprint
+        self._last_emit_time = emit_time
+
+        # Emit only the fields that changed since the last emit to the dashboard
+        delta = copy.deepcopy(_diff(self.state, self._last_state))
+        if delta:
+            self._last_state.update(delta)
+            socketio.emit('update_delta', delta)
+
+    def on_connect(self, auth=None):
+        """
+        Send the full dashboard state and the static rule metadata to a newly
+        connected client; it only receives deltas after that.
+        """
+        emit('update', {**self._last_state, 'rule_meta': RULE_META})
 
     def boiler_on_algorithm(self, temp: TemperatureReadings, status: PumpStatus):
         """
         If boiler is ON, run the "emergency overheat" rule, then normal rule if no emergency.
         """
         self.logger.debug("Boiler ON => Checking Rule One & Rule Two.")
-        self.apply_rule_one(temp, status)
+        emergency, cleared, pump_start, pump_stop = evaluate_boiler_on_rules(temp.as_array())
+        self.apply_rule_one(emergency, cleared, status)
         if not self.rule_one_active:
-            self.apply_rule_two(temp, status)
+            self.apply_rule_two(pump_start, pump_stop, status)
 
-    def apply_rule_one(self, temp: TemperatureReadings, status: PumpStatus):
+    def apply_rule_one(self, emergency_condition, conditions_cleared, status: PumpStatus):
         """
         Overheat protection: If TBTOP > 87°C OR T1BOT > 80°C OR TRET > 60°C => PT1T2 ON
+        (conditions come from evaluate_boiler_on_rules).
         """
-        emergency_condition = (
-            (temp.TBTOP and temp.TBTOP > BOILER_OVERHEAT_THRESHOLD) or
-            (temp.T1BOT and temp.T1BOT > CRITICAL_TANK_TEMP) or
-            (temp.TRET  and temp.TRET  > RETURNS_TEMP_ON_THRESHOLD)
-        )
-
         if emergency_condition:
             self.rule_one_active = True
             # Turn on PT1T2 to move heat away if not already
@@ -477,84 +910,48 @@ class Algorithm:
         else:
             # If previously active, check safe conditions
             if self.rule_one_active:
-                conditions_cleared = (
-                    (temp.TRET is not None and temp.TRET <= RETURNS_TEMP_OFF_THRESHOLD)
-                    and (temp.TBTOP is not None and temp.TBTOP < BOILER_SAFE_THRESHOLD)
-                )
                 # Stop PT1T2 if conditions are safe and we've run min ON time
-                if conditions_cleared and self.pump_runtime_PT1T2 >= PUMP_MIN_ON_TIME:
+                if conditions_cleared and self.pt1t2.runtime >= PUMP_MIN_ON_TIME:
                     self.set_transfer_pump("PT1T2", False)
                     self.rule_one_active = False
                     self.logger.info("Rule One cleared: PT1T2 OFF after safe conditions.")
 
-        # Update counters
-        if self.pump_state_PT1T2:
-            self.pump_runtime_PT1T2 += 1
-            self.pump_offtime_PT1T2 = 0
-        else:
-            self.pump_offtime_PT1T2 += 1
-            self.pump_runtime_PT1T2 = 0
-
-    def apply_rule_two(self, temp: TemperatureReadings, status: PumpStatus):
+    def apply_rule_two(self, pump_start, pump_stop, status: PumpStatus):
         """
         Normal operation. 
         If TRET > 60°C or (T1BOT >= 58°C & T1MID > T2TOP + 5°C) => PT1T2 ON (after OFF time).
         Stop => if (T1BOT - T3BOT) <= 3°C after min ON time.
+        (conditions come from evaluate_boiler_on_rules).
         """
         self.rule_two_active = False
 
-        # Start condition
-        pump_start = False
-        if temp.TRET and temp.TRET > RETURNS_TEMP_ON_THRESHOLD:
-            pump_start = True
-        else:
-            if all(x is not None for x in [temp.T1BOT, temp.T1MID, temp.T2TOP]):
-                if (
-                    temp.T1BOT >= 5800 and
-                    (temp.T1MID > (temp.T2TOP + TEMP_DIFF_ON_THRESHOLD))
-                ):
-                    pump_start = True
-
-        # Stop condition
-        pump_stop = False
-        if all(x is not None for x in [temp.T1BOT, temp.T3BOT]):
-            if (temp.T1BOT - temp.T3BOT) <= TEMP_DIFF_OFF_THRESHOLD:
-                pump_stop = True
-
         # Start pump if conditions + min OFF time
         if pump_start and not status.PT1T2:
-            if self.pump_offtime_PT1T2 >= PUMP_MIN_OFF_TIME:
+            if self.pt1t2.offtime >= PUMP_MIN_OFF_TIME:
                 self.set_transfer_pump("PT1T2", True)
                 self.logger.info("Rule Two triggered: PT1T2 ON (normal ops).")
                 self.rule_two_active = True
 
         # Stop pump if conditions + min ON time
         if pump_stop and status.PT1T2:
-            if self.pump_runtime_PT1T2 >= PUMP_MIN_ON_TIME:
+            if self.pt1t2.runtime >= PUMP_MIN_ON_TIME:
                 self.set_transfer_pump("PT1T2", False)
                 self.logger.info("Rule Two stopping: PT1T2 OFF (temp diff small).")
 
         # Mark rule active if PT1T2 is ON and not overridden
-        if self.pump_state_PT1T2 and not self.rule_one_active:
+        if self.pt1t2.is_on and not self.rule_one_active:
             self.rule_two_active = True
 
-        # Update counters
-        if self.pump_state_PT1T2:
-            self.pump_runtime_PT1T2 += 1
-            self.pump_offtime_PT1T2 = 0
-        else:
-            self.pump_offtime_PT1T2 += 1
-            self.pump_runtime_PT1T2 = 0
-
     #
     # --- BOILER OFF ALGORITHM: T2->T1 with SCALED ENERGY + Hysteresis ---
     #
-    def boiler_off_algorithm(self, temp: TemperatureReadings, status: PumpStatus):
+    def boiler_off_algorithm(self, temp: TemperatureReadings, status: PumpStatus, temp_dt=None):
         """
         If Boiler is OFF, transfer heat from Tank 2 -> Tank 1 if T2 has more (scaled) energy.
         Using hysteresis to avoid rapid toggling, and min ON/OFF times.
         """
         self.logger.debug("Running Boiler OFF Algorithm")
+        status_pt2t1 = status.PT2T1
 
         # Reset rule states so next time boiler goes ON, we don't get stuck
         self.rule_one_active = False
@@ -564,104 +961,110 @@ class Algorithm:
         self.set_transfer_pump("PT1T2", False)
 
         # Determine if we should transfer T2->T1
-        should_transfer = self.should_transfer_tank2_to_tank1(temp)
+        should_transfer = self.should_transfer_tank2_to_tank1(temp, temp_dt)
 
         # For the "Boiler OFF" rule, store relevant observed values for the UI
-        # We'll add them here so they appear in self.rules[2]["actual_values"]
-        observed = self.rules[2]["actual_values"]
-        observed["PT2T1_runtime"] = self.pump_runtime_PT2T1
-        observed["PT2T1_offtime"] = self.pump_offtime_PT2T1
+        # We'll add them here so they appear in self.rule_state[2]["actual_values"]
+        pt2t1 = self.pt2t1
+        self.boiler_off_observed.update({
+            "PT2T1_runtime": pt2t1.runtime,
+            "PT2T1_offtime": pt2t1.offtime,
+        })
 
         if should_transfer:
-            if not status.PT2T1 and self.pump_offtime_PT2T1 >= PUMP_MIN_OFF_TIME:
+            if not status_pt2t1 and self.pt2t1.offtime >= PUMP_MIN_OFF_TIME:
                 self.set_transfer_pump("PT2T1", True)
                 self.logger.info("Boiler OFF: Starting PT2T1 (scaled-energy, hysteresis).")
-            elif status.PT2T1:
+            elif status_pt2t1:
                 self.logger.debug("PT2T1 pump already running (Boiler OFF).")
             else:
                 self.logger.debug(
-                    f"Waiting for min off time: {self.pump_offtime_PT2T1}/{PUMP_MIN_OFF_TIME}"
+                    "Waiting for min off time: %s/%s", self.pt2t1.offtime, PUMP_MIN_OFF_TIME
                 )
         else:
-            if status.PT2T1 and self.pump_runtime_PT2T1 >= PUMP_MIN_ON_TIME:
+            if status_pt2t1 and self.pt2t1.runtime >= PUMP_MIN_ON_TIME:
                 self.set_transfer_pump("PT2T1", False)
                 self.logger.info("Boiler OFF: Stopping PT2T1, conditions no longer met.")
-            elif status.PT2T1 and self.pump_runtime_PT2T1 < PUMP_MIN_ON_TIME:
+            elif status_pt2t1 and self.pt2t1.runtime < PUMP_MIN_ON_TIME:
                 self.logger.debug(
-                    f"Waiting for minimum run time: {self.pump_runtime_PT2T1}/{PUMP_MIN_ON_TIME}"
+                    "Waiting for minimum run time: %s/%s", self.pt2t1.runtime, PUMP_MIN_ON_TIME
                 )
             else:
                 self.logger.debug("PT2T1 is off or conditions not met (Boiler OFF).")
 
-        # Update runtime + offtime for PT2T1
-        if self.pump_state_PT2T1:
-            self.pump_runtime_PT2T1 += 1
-            self.pump_offtime_PT2T1 = 0
-            self.logger.debug(f"PT2T1 runtime: {self.pump_runtime_PT2T1}")
+        if self.pt2t1.is_on:
+            self.logger.debug("PT2T1 runtime: %s", self.pt2t1.runtime)
         else:
-            self.pump_offtime_PT2T1 += 1
-            self.pump_runtime_PT2T1 = 0
-            self.logger.debug(f"PT2T1 off time: {self.pump_offtime_PT2T1}")
+            self.logger.debug("PT2T1 off time: %s", self.pt2t1.offtime)
 
         # Additional check: stop PT2T1 if T1BOT is 2°C higher than T3TOP
-        if (temp.T1BOT is not None) and (temp.T3TOP is not None):
-            if (temp.T1BOT - temp.T3TOP) >= 200:  # 2°C difference = 200 in hundredths
-                if status.PT2T1 and self.pump_runtime_PT2T1 >= PUMP_MIN_ON_TIME:
+        t1bot = temp.T1BOT
+        t3top = temp.T3TOP
+        if (t1bot is not None) and (t3top is not None):
+            if (t1bot - t3top) >= T1_OVER_T3_STOP_DIFF:
+                if status_pt2t1 and self.pt2t1.runtime >= PUMP_MIN_ON_TIME:
                     self.set_transfer_pump("PT2T1", False)
                     self.logger.info("Stopping PT2T1: T1BOT is 2°C higher than T3TOP.")
-                elif status.PT2T1 and self.pump_runtime_PT2T1 < PUMP_MIN_ON_TIME:
+                elif status_pt2t1 and self.pt2t1.runtime < PUMP_MIN_ON_TIME:
                     self.logger.debug(
-                        f"Waiting for min run time before stopping PT2T1: {self.pump_runtime_PT2T1}"
+                        "Waiting for min run time before stopping PT2T1: %s", self.pt2t1.runtime
                     )
 
         self.boiler_off_active = True
 
-    def should_transfer_tank2_to_tank1(self, temp: TemperatureReadings) -> bool:
+    def should_transfer_tank2_to_tank1(self, temp: TemperatureReadings, temp_dt=None) -> bool:
         """
         Determines if T2 has significantly more 'scaled' energy than T1, using hysteresis.
         We scale T2's total energy to T1's volume so that if T1 and T2 have the same 
         temperature, the difference is 0 (i.e., no advantage).
+        The energies are only recomputed when temp_dt differs from the last call
+        (or is None); the hysteresis check below runs every time.
         """
+        if temp_dt is None or temp_dt != self._last_temp_dt:
+            self._last_temp_dt = None
+
+            # 1) Both tanks need complete readings
+            if temp.T1TOP is None or temp.T1MID is None or temp.T1BOT is None:
+                self.logger.warning("Cannot compute T1 average temperature.")
+                return False
+
+            if temp.T2TOP is None or temp.T2MID is None or temp.T2BOT is None:
+                self.logger.warning("Cannot compute T2 average temperature.")
+                return False
+
+            # 2) + 3) Energies in Wh, T2 scaled to T1's volume
+            (avg_temp_t1, avg_temp_t2,
+             energy_tank1, energy_tank2,
+             scaled_energy_t2, diff) = evaluate_tank_energies(
+                temp.as_array(), self._k_tank1, self._k_tank2, self._vol_ratio
+            )
 
-        # 1) Calculate average temps for T1, T2
-        if None not in (temp.T1TOP, temp.T1MID, temp.T1BOT):
-            avg_temp_t1 = (temp.T1TOP + temp.T1MID + temp.T1BOT) / 300.0
-        else:
-            self.logger.warning("Cannot compute T1 average temperature.")
-            return False
+            # Energy trace is only built when DEBUG is on; at INFO it costs nothing
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Avg T1: %.2f°C => E1: %.2f Wh, Avg T2: %.2f°C => E2: %.2f Wh, "
+                    "Scaled E2->T1Vol: %.2f Wh => diff: %.2f Wh",
+                    avg_temp_t1, energy_tank1, avg_temp_t2, energy_tank2, scaled_energy_t2, diff
+                )
 
-        if None not in (temp.T2TOP, temp.T2MID, temp.T2BOT):
-            avg_temp_t2 = (temp.T2TOP + temp.T2MID + temp.T2BOT) / 300.0
+            # Save in the "Boiler OFF" rule's actual_values for the UI
+            self.boiler_off_observed.update({
+                "Tank1_energy": round(energy_tank1, 2),
+                "Tank2_energy": round(energy_tank2, 2),
+                "scaled_energy_T2": round(scaled_energy_t2, 2),
+                "diff": round(diff, 2),
+                "ENERGY_DIFF_START": ENERGY_DIFF_START,
+                "ENERGY_DIFF_STOP": ENERGY_DIFF_STOP,
+            })
+
+            self._tank_energy_diff = diff
+            self._last_temp_dt = temp_dt
         else:
-            self.logger.warning("Cannot compute T2 average temperature.")
-            return False
-
-        # 2) Compute total energies in Wh
-        energy_tank1 = self.tank_volumes['Tank1'] * avg_temp_t1 * SPECIFIC_HEAT_CAPACITY
-        energy_tank2 = self.tank_volumes['Tank2'] * avg_temp_t2 * SPECIFIC_HEAT_CAPACITY
-
-        # 3) Scale T2's energy to T1's volume
-        # so if T2 and T1 have same avg temp => diff is 0
-        scaled_energy_t2 = (energy_tank2 / self.tank_volumes['Tank2']) * self.tank_volumes['Tank1']
-        diff = scaled_energy_t2 - energy_tank1
-
-        self.logger.debug(
-            f"Avg T1: {avg_temp_t1:.2f}°C => E1: {energy_tank1:.2f} Wh, "
-            f"Avg T2: {avg_temp_t2:.2f}°C => E2: {energy_tank2:.2f} Wh, "
-            f"Scaled E2->T1Vol: {scaled_energy_t2:.2f} Wh => diff: {diff:.2f} Wh"
-        )
-
-        # Save in the "Boiler OFF" rule's actual_values for the UI
-        self.rules[2]["actual_values"]["Tank1_energy"] = round(energy_tank1, 2)
-        self.rules[2]["actual_values"]["Tank2_energy"] = round(energy_tank2, 2)
-        self.rules[2]["actual_values"]["scaled_energy_T2"] = round(scaled_energy_t2, 2)
-        self.rules[2]["actual_values"]["diff"] = round(diff, 2)
-        self.rules[2]["actual_values"]["ENERGY_DIFF_START"] = ENERGY_DIFF_START
-        self.rules[2]["actual_values"]["ENERGY_DIFF_STOP"] = ENERGY_DIFF_STOP
+            diff = self._tank_energy_diff
 
         # 4) Hysteresis logic
         # If PT2T1 is OFF, only start if diff > ENERGY_DIFF_START
-        if not self.pump_state_PT2T1:
+        if not self.pt2t1.is_on:
             return diff > ENERGY_DIFF_START
         else:
             # If PT2T1 is already ON, keep running unless diff < ENERGY_DIFF_STOP
@@ -681,13 +1084,10 @@ class MainClass:
         # Initialize DB pool
         try:
             self.cnx_pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name="mypool",
-                pool_size=5,
                 user=self.parser.user,
                 password=self.parser.password,
                 host=self.parser.host,
-                database="logiview",
-                connect_timeout=10
+                **MYSQL_POOL_KWARGS
             )
             self.logger.info("MySQL connection pool initialized!")
         except mysql.connector.Error as err:
@@ -697,7 +1097,17 @@ class MainClass:
         # Prepare temperature + status objects
         self.temp = TemperatureReadings()
         self.status = PumpStatus()
+        # When the last new, complete DB row was read (reset after each stale warning)
         self.last_data_timestamp = datetime.now()
+        # datetime of the DB row currently held in self.temp (None = nothing cached)
+        self.last_row_datetime = None
+        # (row datetime, PumpStatus) last written to the DB by update_status_in_db
+        self.last_status_fingerprint = None
+        # Connection + cursors reused by every query, see get_cursor()
+        self.cnx = None
+        self.cursor = None
+        self.temps_cursor = None
+        self.update_cursor = None
 
         # Start Flask in a separate thread (port=5000 by default)
         self.app = app
@@ -711,46 +1121,94 @@ class MainClass:
         """
         try:
             self.logger.info("Starting Flask on 0.0.0.0:5000")
-            self.socketio.run(self.app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+            self.socketio.run(
+                self.app, host='0.0.0.0', port=5000, debug=False, use_reloader=False,
+                log_output=False
+            )
         except Exception as e:
             self.logger.error(f"Flask server start error: {e}")
             exit_program(self.logger, self.pushbullet, 1, "Flask server failed")
 
-    def update_status_in_db(self, column_name, value):
+    def get_cursor(self):
+        """
+        Return the cursor that every query shares, checking a connection out
+        of the pool first if none is held (at startup or after an error).
+        The per-cycle temperature SELECT and status UPDATE get their own
+        prepared cursors (self.temps_cursor, self.update_cursor), so each is
+        parsed by the server once per connection.
+        Returns None (logged) if the pool cannot provide one.
         """
-        Example: update the latest record's status in the DB (e.g. BP=1 or PT2T1=0).
+        if self.cursor is None:
+            try:
+                self.cnx = self.cnx_pool.get_connection()
+                # A prepared cursor holds one statement; re-executing it only
+                # sends the parameters
+                self.temps_cursor = self.cnx.cursor(prepared=True)
+                self.update_cursor = self.cnx.cursor(prepared=True)
+                # Buffered, so each result is read in full and the cursor can be reused
+                self.cursor = self.cnx.cursor(buffered=True)
+            except mysql.connector.Error as err:
+                self.logger.error(f"DB connection error: {err}")
+                self.release_connection()
+        return self.cursor
+
+    def release_connection(self):
         """
-        val_int = 1 if value else 0
-        sql = f"UPDATE logiview.tempdata SET {column_name} = {val_int} ORDER BY datetime DESC LIMIT 1"
+        Drop the held cursor/connection after a DB error. The connection goes
+        back to the pool, which reconnects it on the next get_cursor().
+        """
+        for resource in (self.cursor, self.temps_cursor, self.update_cursor, self.cnx):
+            if resource is not None:
+                try:
+                    resource.close()
+                except mysql.connector.Error as err:
+                    self.logger.debug("Ignoring error while closing DB resource: %s", err)
+        self.cursor = None
+        self.temps_cursor = None
+        self.update_cursor = None
+        self.cnx = None
+
+    def update_status_in_db(self, cursor, status, row_datetime):
+        """
+        Write BP, PT2T1 and PT1T2 to the record at row_datetime in one UPDATE.
+        Returns True if the update was written.
+        """
+        values = tuple(1 if getattr(status, col) else 0 for col in STATUS_DB_COLUMNS)
         try:
-            with self.cnx_pool.get_connection() as cnx:
-                with cnx.cursor() as cursor:
-                    cursor.execute(sql)
-                    cnx.commit()
-                    self.logger.debug(f"Updated {column_name} to {val_int} in DB")
+            cursor.execute(STATUS_UPDATE_SQL, values + (row_datetime,))
+            self.logger.debug("Updated %s to %s in DB", STATUS_DB_COLUMNS, values)
+            return True
         except mysql.connector.Error as err:
-            self.logger.error(f"DB error updating {column_name}: {err}")
+            self.logger.error(f"DB error updating statuses: {err}")
+            self.release_connection()
+            return False
 
-    def check_data_timestamp(self):
+    def get_latest_row_datetime(self, cursor):
         """
-        Checks if the DB has a new entry within last 5 minutes.
+        Return the datetime of the newest logiview.tempdata row, or None on error.
+        The row reads/updates are then keyed on it (WHERE datetime = %s), so
+        nothing per tick needs ORDER BY datetime DESC. MAX() and the equality
+        lookups are index seeks only if tempdata.datetime is indexed:
+            CREATE INDEX idx_tempdata_dt ON logiview.tempdata (datetime);
         """
-        sql = "SELECT MAX(datetime) FROM logiview.tempdata"
         try:
-            with self.cnx_pool.get_connection() as cnx:
-                with cnx.cursor() as cursor:
-                    cursor.execute(sql)
-                    result = cursor.fetchone()
-                    if result and result[0]:
-                        last_entry = result[0]
-                        if (datetime.now() - last_entry) > timedelta(minutes=5):
-                            self.logger.warning("No new DB data in over 5 mins.")
-                            if self.pushbullet and USE_PUSHBULLET:
-                                self.pushbullet.push_note("WARNING", "No data in DB for 5+ mins.")
-                    else:
-                        self.logger.warning("Could not retrieve last DB timestamp.")
+            cursor.execute(LATEST_ROW_DATETIME_SQL)
+            result = cursor.fetchone()
+            return result[0] if result else None
         except mysql.connector.Error as err:
-            self.logger.error(f"DB error checking timestamp: {err}")
+            self.logger.error(f"DB error reading latest row datetime: {err}")
+            self.release_connection()
+            return None
+
+    def report_stale_data(self):
+        """
+        Warn that no new, complete DB row has arrived in the last 5 minutes.
+        main_loop tracks that in self.last_data_timestamp from the row it
+        already reads every tick, so no extra query is needed.
+        """
+        self.logger.warning("No new DB data in over 5 mins.")
+        if self.pushbullet and USE_PUSHBULLET:
+            self.pushbullet.push_note("WARNING", "No data in DB for 5+ mins.")
 
     def main_loop(self):
         """
@@ -763,52 +1221,75 @@ class MainClass:
             algorithm = Algorithm(plc_handler, self.logger)
             self.logger.info("Algorithm created successfully.")
 
+            # Deadline scheduler: keeps a fixed cadence regardless of DB/PLC latency
+            next_tick = time.monotonic()
             while True:
-                # 1. Get all temperature values
-                complete_data = True
-                for col in TEMP_COLUMNS:
-                    val = get_temperature_value(self.cnx_pool, col, self.logger)
-                    if val is None:
-                        complete_data = False
-                    setattr(self.temp, col, val)
-
-                if complete_data:
-                    self.last_data_timestamp = datetime.now()
-                else:
-                    self.logger.warning("Some temperature data is None, using last known...")
+                next_tick += CYCLE_TIME
+
+                # One connection/cursor is kept open across cycles; after a DB
+                # error it is dropped and checked out again here. Without one,
+                # row_datetime stays None and the DB steps are skipped.
+                cursor = self.get_cursor()
+
+                # 1. Get all temperature values, unless the newest row is already cached
+                row_datetime = self.get_latest_row_datetime(cursor) if cursor is not None else None
+                if row_datetime is None or row_datetime != self.last_row_datetime:
+                    values = None
+                    if row_datetime is not None:
+                        values = get_all_temperatures(self.temps_cursor, row_datetime, self.logger)
+                        if values is None:
+                            self.release_connection()
+                    if values is None:
+                        values = [None] * len(TEMP_COLUMNS)
+                    complete_data = None not in values
+                    self.temp.set_all(values)
+
+                    if complete_data:
+                        self.last_data_timestamp = datetime.now()
+                        self.last_row_datetime = row_datetime
+                    else:
+                        # Don't cache a partial row; refetch on the next tick
+                        self.last_row_datetime = None
+                        self.logger.warning("Some temperature data is None, using last known...")
 
-                # 2. Check data staleness every 5 minutes
+                # 2. Warn (at most every 5 minutes) while no new row arrives
                 if (datetime.now() - self.last_data_timestamp) > timedelta(minutes=5):
-                    self.check_data_timestamp()
+                    self.report_stale_data()
                     self.last_data_timestamp = datetime.now()
 
                 # 3. Read pump statuses from PLC
                 try:
-                    self.status.BP = plc_handler.read_bit("V1.0", 0)
-                    self.status.PT2T1 = plc_handler.read_bit("V1.1", 0)
-                    self.status.PT1T2 = plc_handler.read_bit("V1.2", 0)
-                    # self.status.WDT = plc_handler.read_bit("V1.3", 0)  # If used
+                    self.status = read_all_pump_status(plc_handler)
                 except Exception as e:
                     self.logger.error(f"PLC read error: {e}")
 
-                # 4. Update DB statuses
-                try:
-                    self.update_status_in_db("BP",    self.status.BP)
-                    self.update_status_in_db("PT2T1", self.status.PT2T1)
-                    self.update_status_in_db("PT1T2", self.status.PT1T2)
-                except Exception as e:
-                    self.logger.error(f"Error updating DB statuses: {e}")
+                # 4. Update DB statuses, only if a pump changed or a new row arrived
+                fingerprint = (row_datetime, self.status)
+                if (self.cursor is not None and row_datetime is not None
+                        and fingerprint != self.last_status_fingerprint):
+                    try:
+                        written = self.update_status_in_db(
+                            self.update_cursor, self.status, row_datetime
+                        )
+                        # Retry next tick if the write failed
+                        self.last_status_fingerprint = fingerprint if written else None
+                    except Exception as e:
+                        self.logger.error(f"Error updating DB statuses: {e}")
 
                 # 5. Run the algorithm
-                algorithm.execute_algorithm(self.temp, self.status)
+                algorithm.execute_algorithm(self.temp, self.status, self.last_row_datetime)
 
-                time.sleep(1)
+                # 6. Sleep until the next tick (resync if this cycle overran)
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
 
         except KeyboardInterrupt:
             self.logger.info("KeyboardInterrupt => shutting down.")
             exit_program(self.logger, self.pushbullet, 0, "Exiting by user request.")
         except SystemExit as e:
-            sys.stderr = self.logger.original_stderr
             exit_program(self.logger, self.pushbullet, e.code, "SystemExit encountered.")
         except Exception as e:
             self.logger.error("Unhandled exception in main_loop:")
@@ -833,8 +1314,11 @@ class Parser:
         self.parser.add_argument("-s", "--snap7-lib", default=None, help="Snap7 library path")
 
     def parse(self):
+        # Capture argparse's usage/error text only while parsing
+        captured_output = io.StringIO()
         try:
-            args = self.parser.parse_args()
+            with contextlib.redirect_stderr(captured_output):
+                args = self.parser.parse_args()
             self.host = args.host
             self.user = args.user
             self.password = args.password
@@ -842,7 +1326,7 @@ class Parser:
             self.snap7_lib = args.snap7_lib
             self.logger.debug("Parsed command-line arguments.")
         except SystemExit:
-            err_msg = sys.stderr.getvalue().strip()
+            err_msg = captured_output.getvalue().strip()
             exit_program(self.logger, None, 1, f"Arg parsing error: {err_msg}")
 
 
@@ -865,6 +1349,9 @@ def main():
     # Create Pushbullet if desired
     pushbullet = Pushbullet(logger, parser.apikey) if (parser.apikey and USE_PUSHBULLET) else None
 
+    # Pay the JIT cost now rather than in the first control cycle
+    warm_up_rule_functions()
+
     main_obj = MainClass(logger, pushbullet, parser)
     main_obj.main_loop()
 
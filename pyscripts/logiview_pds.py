@@ -41,15 +41,18 @@
 
 # Standard library imports
 import argparse            # Parser for command-line options and arguments
+import asyncio             # Event loop serving all client connections
 import io                  # Core tools for working with streams
 import json                # JSON encoder and decoder
 import logging             # Logging library for Python
 import logging.handlers    # Additional handlers for the logging module
 import socket              # Low-level networking interface
 import sys                 # Access to Python interpreter variables and functions
+import time                # Time access and conversions
 
 # Third-party imports
 import mysql.connector     # MySQL database connector for Python
+from mysql.connector import pooling  # Connection pooling
 import setproctitle       # Allows customization of the process title
 
 
@@ -62,6 +65,125 @@ LOGGING_LEVEL = logging.WARNING
 # Setting up constants
 SOCKET_PORT = 45140
 
+# Query for the total kWh of the current day and the current peak kW.
+# The day is a range on the bare datetime column (not DATE(datetime)),
+# so with an index on it each subquery is a single index seek:
+#   CREATE INDEX idx_smartmeter_datetime ON elvis.smartmeter (datetime);
+PREP_SQL = """
+    SELECT (SELECT TotKWh FROM elvis.smartmeter
+    WHERE datetime >= CURDATE() AND datetime < CURDATE() + INTERVAL 1 DAY
+    ORDER BY datetime ASC LIMIT 1) AS InitialKWh,
+    (SELECT TotKWh FROM elvis.smartmeter
+    WHERE datetime >= CURDATE() AND datetime < CURDATE() + INTERVAL 1 DAY
+    ORDER BY datetime DESC LIMIT 1) AS CurrentKWh,
+    (SELECT PkW FROM elvis.smartmeter
+    WHERE datetime >= CURDATE() AND datetime < CURDATE() + INTERVAL 1 DAY
+    ORDER BY datetime DESC LIMIT 1) AS CurrentPkW
+"""
+
+# The smartmeter only samples every few seconds, so clients connecting within
+# CACHE_TTL seconds of each other get the same encoded reply without a query
+CACHE_TTL = 5
+_CACHE = {"ts": 0.0, "payload": None}
+
+# Pooled MySQL connections; the pool hands out a reconnected connection if the
+# server dropped an idle one, and lets up to this many clients query at once
+DB_POOL_SIZE = 4
+
+
+def query_payload(cnx_pool, logger):
+    """
+    Run PREP_SQL on a pooled connection and return the encoded JSON reply
+    (also stored in _CACHE), or None if no data was retrieved.
+    Blocking; called from a worker thread.
+    """
+    logger.info("Executing query: %s", PREP_SQL)
+
+    cnx = cnx_pool.get_connection()
+    try:
+        # A plain cursor: the connection is only held for this one query, and a
+        # prepared cursor would add a prepare/close round trip on top of it
+        cursor = cnx.cursor()
+        try:
+            # Execute the SQL query and fetch the result
+            cursor.execute(PREP_SQL)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        result = rows[0] if rows else None
+        logger.info("Query result: %s", result)
+    finally:
+        cnx.close()  # Return it to the pool
+
+    if not result:
+        logger.error("No data retrieved from the database.")
+        return None
+
+    initial_kwh = result[0] or 0  # Use 0 if initial_kwh is None
+    current_kwh = result[1] or 0  # Use 0 if current_kwh is None
+    current_pkw = result[2] or 0  # Use 0 if current_pkw is None
+
+    totkwh_value = current_kwh - initial_kwh
+
+    jstr = {"TOTKWH": str(totkwh_value), "PKW": str(current_pkw)}
+
+    # Serialize once, in compact form; cached replies reuse the bytes
+    payload = json.dumps(jstr, separators=(",", ":")).encode()
+
+    # Print or use the JSON data as needed
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("JSON Data: %s", payload.decode())
+    _CACHE["ts"] = time.monotonic()
+    _CACHE["payload"] = payload
+    return payload
+
+
+async def serve(cnx_pool, logger):
+    """
+    Serve clients on SOCKET_PORT from one event loop, so a client waiting on
+    the database or a slow send doesn't hold up the others. The blocking
+    MySQL call runs in a worker thread on its own pooled connection, with at
+    most DB_POOL_SIZE of them at a time.
+    """
+    db_slots = asyncio.Semaphore(DB_POOL_SIZE)
+
+    async def get_payload():
+        # Checked again after waiting for a slot: a client that waited may
+        # reuse the result another client just fetched
+        async with db_slots:
+            if _CACHE["payload"] is not None and time.monotonic() - _CACHE["ts"] < CACHE_TTL:
+                # Reply from the cache while it is fresh
+                logger.info("Using cached JSON data")
+                return _CACHE["payload"]
+            return await asyncio.to_thread(query_payload, cnx_pool, logger)
+
+    async def handle_client(reader, writer):
+        addr = writer.get_extra_info("peername")
+        logger.info("Connection established with %s", addr)
+        try:
+            payload = await get_payload()
+            if payload is not None:
+                writer.write(payload)
+                await writer.drain()
+        except mysql.connector.Error as err:
+            # The pool reconnects on the next checkout, so keep serving
+            logger.error(f"MySQL error: {err}")
+        except Exception as e:
+            logger.error("Send failed: %s", e)
+        finally:
+            writer.close()
+
+    # SO_REUSEADDR lets a restart by logiview_pm rebind the port right away,
+    # while the old socket is still in TIME_WAIT. asyncio already sets
+    # TCP_NODELAY on every accepted connection, so the small reply isn't held
+    # back by Nagle's algorithm.
+    server = await asyncio.start_server(
+        handle_client, "", SOCKET_PORT, reuse_address=True
+    )
+    logger.info("Socket is listening on port %s", SOCKET_PORT)
+    async with server:
+        await server.serve_forever()
+
 
 def main():
     # Setting up the logging
@@ -94,84 +216,31 @@ def main():
 
         args = parser.parse_args()
 
-        logger.info(f"Parsed command-line arguments successfully!")
-        logger.info(f"Connecting to MySQL server at {args.host} with user {args.user}")
+        logger.info("Parsed command-line arguments successfully!")
+        logger.info("Connecting to MySQL server at %s with user %s", args.host, args.user)
 
         # Connect to the MySQL server
         try:
-            cnx = mysql.connector.connect(
+            cnx_pool = pooling.MySQLConnectionPool(
+                pool_name="pds",
+                pool_size=DB_POOL_SIZE,
                 user=args.user,
                 password=args.password,
                 host=args.host,
                 database="elvis",  # Assuming you always connect to this database
+                # Each SELECT is its own transaction and always sees the newest
+                # rows, so no ROLLBACK round trip is needed after it
+                autocommit=True,
             )
             logger.info("Successfully connected to the MySQL server!")
 
-            cursor = cnx.cursor()
-
-            # Create a socket and bind to port SOCKET_PORT
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(("", SOCKET_PORT))
-                s.listen()
-                logger.info(f"Socket is listening on port {SOCKET_PORT}")
-
-                # Infinite loop to accept client connections
-                while True:
-                    conn, addr = s.accept()
-                    with conn:
-                        logger.info(f"Connection established with {addr}")
-
-                        # Update the SQL query to calculate the total kWh for the current day
-                        sqlquery = """
-                            SELECT (SELECT TotKWh FROM elvis.smartmeter 
-                            WHERE DATE(datetime) = CURDATE() 
-                            ORDER BY datetime ASC LIMIT 1) AS InitialKWh,
-                            (SELECT TotKWh FROM elvis.smartmeter 
-                            WHERE DATE(datetime) = CURDATE() 
-                            ORDER BY datetime DESC LIMIT 1) AS CurrentKWh,
-                            (SELECT PkW FROM elvis.smartmeter 
-                            WHERE DATE(datetime) = CURDATE() 
-                            ORDER BY datetime DESC LIMIT 1) AS CurrentPkW
-                        """
-
-                        logger.info(f"Executing query: {sqlquery}")
-
-                        # Execute the SQL query and fetch the result
-                        cursor.execute(sqlquery)
-                        result = cursor.fetchone()
-                        logger.info(f"Query result: {result}")
-
-                        cnx.rollback()  # Need to roll back the transaction even if there is no error
-
-                        if result:
-                            initial_kwh = result[0] or 0  # Use 0 if initial_kwh is None
-                            current_kwh = result[1] or 0  # Use 0 if current_kwh is None
-                            current_pkw = result[2] or 0  # Use 0 if current_pkw is None
-
-                            totkwh_value = current_kwh - initial_kwh
-
-                            jstr = {"TOTKWH": str(totkwh_value), "PKW": str(current_pkw)}
-
-                            # Print or use the JSON data as needed
-                            logger.info("JSON Data: %s", json.dumps(jstr, indent=4))
-
-                            try:
-                                conn.send(json.dumps(jstr).encode())
-                            except Exception as e:
-                                logger.error("Send failed: %s", e)
-                        else:
-                            logger.error("No data retrieved from the database.")
-
-                    conn.close()
+            # Accept client connections on SOCKET_PORT
+            asyncio.run(serve(cnx_pool, logger))
         except mysql.connector.Error as err:
             logger.error(f"Error connecting to MySQL server: {err}")
             sys.exit(1)
         except KeyboardInterrupt:
             logger.info("Received a keyboard interrupt. Shutting down gracefully...")
-            if "cnx" in locals() and cnx.is_connected():
-                cnx.close()
-            if "conn" in locals():
-                conn.close()
             sys.exit(0)
         except socket.error as e:
             logger.error(f"Socket error occurred: {e}")
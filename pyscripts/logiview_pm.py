@@ -9,8 +9,8 @@
 # Each script being monitored can have a unique process title set using the setproctitle module. This
 # title is used by the monitor script to identify the process and check its running status.
 #
-# If a monitored script crashes or stops for any reason, the monitor will detect its absence within a
-# minute and will attempt to restart it.
+# If a monitored script started by the monitor crashes, the monitor is woken by SIGCHLD and restarts it
+# right away. Scripts it did not start are checked every CHECK_INTERVAL seconds.
 #
 # The scripts to be monitored, their unique process titles, and their associated arguments are defined
 # in the `scripts_to_monitor` dictionary.
@@ -60,6 +60,9 @@ import argparse          # Parser for command-line options and arguments
 import io                # Core tools for working with streams
 import logging           # Logging library for Python
 import logging.handlers  # Additional handlers for the logging module
+import os                # Miscellaneous operating system interfaces
+import select            # Waiting for I/O completion
+import signal            # Set handlers for asynchronous events
 import subprocess        # To spawn new processes, connect to their input/output/error pipes
 import sys               # Access to Python interpreter variables
 import time              # Time-related functions
@@ -76,6 +79,9 @@ setproctitle.setproctitle("logiview_pm")
 LOGGING_LEVEL = logging.WARNING
 USE_PUSHBULLET = True
 
+CHECK_INTERVAL = 28          # Seconds between checks when no child has exited
+MIN_RESTART_INTERVAL = 10    # Seconds a child must have run to be restarted on SIGCHLD
+
 
 class PushBullet:
     def __init__(self, enabled, logger, apikey, name):
@@ -172,81 +178,138 @@ class LogiviewPMserver:
 
     def mask_password(self, args):
         # Mask the password in the arguments list.
-        # Returns a new list with the password replaced by '<hidden>'.
+        # Returns the joined command line with the password replaced by '<hidden>'.
         masked_args = args[:]
         try:
             password_index = masked_args.index("--password") + 1
             if password_index < len(masked_args):
                 masked_args[password_index] = "<hidden>"
         except ValueError:
-            return ' '.join(self.args[:])  # "--password" not found in args
+            pass  # "--password" not found in args
         return ' '.join(masked_args)
 
-    def check_and_start(self, scripts_with_titles):
-        for script, (title, args, use_authbind, use_setsid) in scripts_with_titles.items():
-            # Check if the script is running using pgrep
-            try:
-                subprocess.check_output(["pgrep", "-f", title])
+    def running_cmdlines(self):
+        # Read the command line of every process from /proc in one pass.
+        # Replaces one `pgrep -f` fork per monitored script and tick.
+        cmdlines = []
+        with os.scandir("/proc") as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                        cmdline = f.read()
+                except OSError:
+                    continue  # Process exited while scanning
+                if cmdline:  # Kernel threads and zombies have no cmdline
+                    cmdlines.append(cmdline.replace(b"\0", b" ").decode(errors="replace"))
+        return cmdlines
+
+    def check_and_start(self, scripts_with_titles, periodic=True):
+        cmdlines = None  # Only scanned if a script wasn't started by us
+        for script, state in scripts_with_titles.items():
+            title, cmd = state["title"], state["cmd"]
+            # A child we started is checked with waitpid, which also reaps it
+            if state["proc"] is not None:
+                if state["proc"].poll() is None:
+                    self.logger.info(f"{title} is running.")
+                    continue
+                # Leave a crash looping script to the next periodic check
+                if not periodic and time.monotonic() - state["started"] < MIN_RESTART_INTERVAL:
+                    continue
+            # Otherwise check the command lines, same match as `pgrep -f`
+            if cmdlines is None:
+                cmdlines = self.running_cmdlines()
+            if any(title in cmdline for cmdline in cmdlines):
                 self.logger.info(f"{title} is running.")
-            except subprocess.CalledProcessError:
+            else:
                 # The script is not running, so start it with its associated arguments.
                 self.logger.warning(f"{title} is not running. Starting it...")
-                cmd = ["authbind", "python3", script] + args if use_authbind else ["python3", script] + args
-                print(f"{cmd}\r\n")
-                # If use_setsid is True, then use setsid to run the process in its own session
-                cmd = ['setsid'] + cmd if use_setsid else cmd
-                subprocess.Popen(cmd)
-                self.logger.info(f"{title} has been started as: {self.mask_password(cmd)}")
+                state["proc"] = subprocess.Popen(cmd)
+                state["started"] = time.monotonic()
+                # Masking copies and joins the argv, skip it when INFO is disabled
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info("%s has been started as: %s", title, self.mask_password(cmd))
 
 
     def main_loop(self):
         try:
             scripts_to_monitor = {
-                "/home/pi/logiview/logiview_sds.py": (
-                    "logiview_sds",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
-                    True,  # use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
-                "/home/pi/logiview/logiview_logo8.py": (
-                    "logiview_logo8",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password",
+                "/home/pi/logiview/logiview_sds.py": {
+                    "title": "logiview_sds",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
+                    "use_authbind": True,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
+                "/home/pi/logiview/logiview_logo8.py": {
+                    "title": "logiview_logo8",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password",
                         self.args.password, "--apikey", self.args.apikey],
-                    True,  # use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
-                "/home/pi/logiview/logiview_pds.py": (
-                    "logiview_pds",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
-                    False,  # do not use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
-                "/home/pi/logiview/logiview_ttt.py": (
-                    "logiview_ttt",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password",
+                    "use_authbind": True,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
+                "/home/pi/logiview/logiview_pds.py": {
+                    "title": "logiview_pds",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
+                    "use_authbind": False,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
+                "/home/pi/logiview/logiview_ttt.py": {
+                    "title": "logiview_ttt",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password",
                         self.args.password, "--apikey", self.args.apikey],
-                    True,  # use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
-                "/home/pi/logiview/logiview_tpds.py": (
-                    "logiview_tpds",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
-                    False,  # do not use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
-                 "/home/pi/logiview/logiview_envds.py": (
-                    "logiview_envds",
-                    ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
-                    False,  # do not use_authbind for this script
-                    True  # do not use_setsid for this script
-                ),
+                    "use_authbind": True,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
+                "/home/pi/logiview/logiview_tpds.py": {
+                    "title": "logiview_tpds",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
+                    "use_authbind": False,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
+                 "/home/pi/logiview/logiview_envds.py": {
+                    "title": "logiview_envds",
+                    "args": ["--host", "192.168.0.240", "--user", "pi", "--password", self.args.password],
+                    "use_authbind": False,
+                    "use_setsid": True,
+                    "proc": None,  # Popen handle once started by us
+                    "started": 0.0,
+                },
                 # ... add more scripts with their titles, arguments, authbind necessity, and setsid usage as needed
             }
 
+            # Build each command line once, it doesn't change between restarts
+            for script, state in scripts_to_monitor.items():
+                cmd = (["authbind"] if state["use_authbind"] else []) + ["python3", script] + state["args"]
+                # If use_setsid is True, then use setsid to run the process in its own session
+                state["cmd"] = ['setsid'] + cmd if state["use_setsid"] else cmd
+
+            # SIGCHLD writes to a self-pipe so that a crashed child is restarted
+            # right away, instead of after up to CHECK_INTERVAL seconds
+            wakeup_r, wakeup_w = os.pipe()
+            os.set_blocking(wakeup_r, False)
+            os.set_blocking(wakeup_w, False)
+            signal.set_wakeup_fd(wakeup_w)
+            signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+            periodic = True
             while True:
                 self.timestamp = datetime.now().strftime("%y-%m-%d %H:%M")  # Update timestamp
-                self.check_and_start(scripts_to_monitor)
-                time.sleep(28)  # Sleep for 28 seconds
+                self.check_and_start(scripts_to_monitor, periodic)
+                readable, _, _ = select.select([wakeup_r], [], [], CHECK_INTERVAL)
+                periodic = not readable
+                if readable:
+                    os.read(wakeup_r, 512)  # Drain the pending wakeups
 
         except KeyboardInterrupt:
             self.logger.info("Received a keyboard interrupt. Shutting down gracefully...")
@@ -103,27 +103,27 @@ def main():
                 energy_min = 20  # Minimum energy value
                 energy_max = 42  # Maximum energy value
                 percentage_str[0] = str(energy_to_percentage(internal_energy_kwh, energy_min, energy_max))
-                print(f"{internal_energy_kwh} kWh is approximately {float(percentage_str[0]):.2f}%")
+                logging.debug("%s kWh is approximately %.2f%%", internal_energy_kwh, float(percentage_str[0]))
                 
                 # Temperature of the water in °C tank 2
                 #--------------------------------------
                 mass_grams = 750000  # 750 liters of water in grams
                 temperature = (float(temps[sensors.index("T2TOP")]) + float(temps[sensors.index("T2MID")]) + float(temps[sensors.index("T2BOT")])) / 3.0
-                print(temperature)
+                logging.debug("Average temperature: %s", temperature)
                 
                 internal_energy_kwh = calculate_internal_energy_kwh(mass_grams, specific_heat, temperature)
-                print(f"Total energy contained at {temperature}°C: {internal_energy_kwh:.2f} kWh")
+                logging.debug("Total energy contained at %s°C: %.2f kWh", temperature, internal_energy_kwh)
                 
                 energy_min = 30  # Minimum energy value
                 energy_max = 74  # Maximum energy value
                 percentage_str[1] = str(energy_to_percentage(internal_energy_kwh, energy_min, energy_max))
-                print(f"{internal_energy_kwh} kWh is approximately {float(percentage_str[1]):.2f}%")
+                logging.debug("%s kWh is approximately %.2f%%", internal_energy_kwh, float(percentage_str[1]))
                 
                 # Temperature of the water in °C tank 3
                 #--------------------------------------
                 mass_grams = 750000  # 750 liters of water in grams
                 temperature = (float(temps[sensors.index("T3TOP")]) + float(temps[sensors.index("T3MID")]) + float(temps[sensors.index("T3BOT")])) / 3.0
-                print(temperature)
+                logging.debug("Average temperature: %s", temperature)
             
                 internal_energy_kwh = calculate_internal_energy_kwh(mass_grams, specific_heat, temperature)
                 #print(f"Total energy contained at {temperature}°C: {internal_energy_kwh:.2f} kWh")
@@ -131,7 +131,7 @@ def main():
                 energy_min = 30  # Minimum energy value
                 energy_max = 74  # Maximum energy value
                 percentage_str[2] = str(energy_to_percentage(internal_energy_kwh, energy_min, energy_max))
-                print(f"{internal_energy_kwh} kWh is approximately {float(percentage_str[2]):.2f}%")		
+                logging.debug("%s kWh is approximately %.2f%%", internal_energy_kwh, float(percentage_str[2]))		
 
                 jstr = json.dumps({"T1P": percentage_str[0], "T2P": percentage_str[1], "T3P": percentage_str[2]})
                 c.send(jstr.encode())
@@ -54,6 +54,7 @@ import setproctitle
 
 LOGGING_LEVEL = logging.WARNING  # Adjust to logging.DEBUG for verbose logging
 USE_PUSHBULLET = True           # Set to False to disable pushbullet notifications
+SAMPLE_INTERVAL = 1.0           # Seconds between sensor reads (fixed cadence)
 
 # ---------------------------------------------------------------------------
 # Helper: Exit the program with an optional message + push notification
@@ -306,6 +307,8 @@ class LogiviewTTTserver:
         reconnect_count = 0
 
         try:
+            # Deadline scheduler: samples stay on a fixed grid regardless of read/insert time
+            next_tick = time.monotonic()
             while True:
                 # Try to receive data from the socket
                 sensor_data = self.sock.receive_sensor_data()
@@ -390,7 +393,15 @@ class LogiviewTTTserver:
                     except mysql.connector.Error as err:
                         self.logger.error(f"Error inserting data: {err}")
 
-                time.sleep(1)  # Minor delay, adjust as needed
+                # Sleep until the next sample slot; resync if this cycle overran
+                next_tick += SAMPLE_INTERVAL
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    if delay < -SAMPLE_INTERVAL:
+                        self.logger.warning(f"Cycle overran by {-delay:.2f} s, resyncing")
+                    next_tick = time.monotonic()
 
         except KeyboardInterrupt:
             self.cleanup()